@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import orjson
 import math
 import asyncio
 import threading
@@ -9,7 +10,7 @@ from datetime import datetime
 
 from sqlalchemy import (
     create_engine, MetaData, Table, Column, String, Integer, Boolean, Float, 
-    Text, TIMESTAMP, JSON, select, text, and_, or_, func, inspect
+    Text, TIMESTAMP, JSON, select, text, and_, or_, func, inspect, event, bindparam
 )
 from sqlalchemy.engine import Engine, Row
 from sqlalchemy.exc import SQLAlchemyError
@@ -19,6 +20,18 @@ from sqlalchemy.pool import QueuePool
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class RawJSON(str):
+    """Already-serialized JSON text, stored verbatim in JSON columns instead of being re-dumped."""
+
+def _json_serializer(value) -> str:
+    if isinstance(value, RawJSON):
+        return value
+    try:
+        return orjson.dumps(value).decode('utf-8')
+    except TypeError:
+        # orjson rejects integers wider than 64 bits and non-string keys; the stdlib handles both
+        return json.dumps(value)
+
 class ReasoningDatabase:
     def __init__(self, db_url: str):
         """
@@ -51,20 +64,34 @@ class ReasoningDatabase:
         """Create and configure the SQLAlchemy engine."""
         # For SQLite, we need to handle concurrent access if using multiple threads
         if self.db_url.startswith('sqlite'):
-            return create_engine(
+            engine = create_engine(
                 self.db_url, 
                 connect_args={'check_same_thread': False},
                 poolclass=QueuePool,
                 pool_size=20,
-                max_overflow=30
+                max_overflow=30,
+                json_serializer=_json_serializer
             )
+
+            @event.listens_for(engine, "connect")
+            def _set_sqlite_pragmas(dbapi_connection, connection_record):
+                # WAL + synchronous=NORMAL avoids an fsync per committed batch during bulk loads
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.execute("PRAGMA cache_size=-262144")
+                cursor.close()
+
+            return engine
         else:
             # PostgreSQL and others
             return create_engine(
                 self.db_url,
                 pool_size=20,
                 max_overflow=30,
-                pool_pre_ping=True
+                pool_pre_ping=True,
+                json_serializer=_json_serializer
             )
 
     def _define_schema(self):
@@ -335,28 +362,42 @@ class ReasoningDatabase:
         if not updates:
             return
             
-        # SQLAlchemy Core execute(stmt, params) does batch updates if params is a list of dicts
-        # But we need to ensure the statement uses bind parameters for values
-        # AND the where clause matches.
-        # Standard bulk update in SQLAlchemy is often done via:
-        # conn.execute(table.update().where(table.c.id == bindparam('b_id')), values)
-        # But here 'values' keys must match bindparams.
-        
-        # Simpler approach: Group by keys or just loop (transactional)
-        # For maximum performance with Postgres, we might want to use specific dialect features,
-        # but for generic SQL, a loop inside a transaction is safe.
-        
+        # Updates that set the same columns share one statement, executed as a single
+        # executemany. Bind names are prefixed because SQLAlchemy reserves the column
+        # names themselves for the SET clause.
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for update_data in updates:
+            if 'id' not in update_data:
+                continue
+            columns = tuple(sorted(k for k in update_data if k != 'id'))
+            if not columns:
+                continue
+            groups.setdefault(columns, []).append(
+                {f"b_{k}": v for k, v in update_data.items()}
+            )
+
         with self.engine.begin() as conn:
-            for update_data in updates:
-                data = update_data.copy()
-                if 'id' not in data:
-                    continue
-                r_id = data.pop('id')
-                if not data:
-                    continue
-                
-                stmt = self.responses.update().where(self.responses.c.id == r_id).values(**data)
-                conn.execute(stmt)
+            for columns, params in groups.items():
+                stmt = self.responses.update().where(
+                    self.responses.c.id == bindparam('b_id')
+                ).values({
+                    col: bindparam(f"b_{col}", type_=self.responses.c[col].type) for col in columns
+                })
+                conn.execute(stmt, params)
+
+
+    def update_responses_by_ids(self, response_ids: List[str], batch_size: int = 500, **kwargs):
+        """Set the same column values on many responses, one UPDATE ... WHERE id IN (...) per batch."""
+        if not response_ids or not kwargs:
+            return
+
+        # Built once with an expanding parameter; every batch reuses the cached compilation
+        stmt = self.responses.update().where(
+            self.responses.c.id.in_(bindparam('ids', expanding=True))
+        ).values(**kwargs)
+        with self.engine.begin() as conn:
+            for i in range(0, len(response_ids), batch_size):
+                conn.execute(stmt, {'ids': response_ids[i:i + batch_size]})
 
 
     def insert_responses_batch(self, responses: List[Dict[str, Any]]):
@@ -380,36 +421,53 @@ class ReasoningDatabase:
     def insert_response(self, response_data: Dict[str, Any]):
         self.insert_responses_batch([response_data])
 
-    def insert_problem(self, problem_data: Dict[str, Any]):
-        stmt = self.problems.insert().values(**problem_data)
-        
+    def insert_problems_batch(self, problems: List[Dict[str, Any]]):
+        if not problems:
+            return
+
         if self.engine.dialect.name == 'sqlite':
-            stmt = stmt.prefix_with('OR IGNORE')
+            stmt = self.problems.insert().prefix_with('OR IGNORE')
         elif self.engine.dialect.name == 'postgresql':
             from sqlalchemy.dialects.postgresql import insert
-            stmt = insert(self.problems).values(**problem_data).on_conflict_do_nothing()
-            
+            stmt = insert(self.problems).on_conflict_do_nothing()
+        else:
+            stmt = self.problems.insert()
+
         with self.engine.begin() as conn:
-            conn.execute(stmt)
+            conn.execute(stmt, problems)
+
+    def insert_problem(self, problem_data: Dict[str, Any]):
+        self.insert_problems_batch([problem_data])
+
+    def insert_request_mappings_batch(self, mappings: List[Dict[str, Any]]):
+        if not mappings:
+            return
 
-    def insert_request_mapping(self, custom_id: str, problem_id: str):
-        data = {'custom_id': custom_id, 'problem_id': problem_id}
-        stmt = self.request_mappings.insert().values(**data)
-        
         if self.engine.dialect.name == 'sqlite':
-            stmt = stmt.prefix_with('OR IGNORE')
+            stmt = self.request_mappings.insert().prefix_with('OR IGNORE')
         elif self.engine.dialect.name == 'postgresql':
             from sqlalchemy.dialects.postgresql import insert
-            stmt = insert(self.request_mappings).values(**data).on_conflict_do_nothing()
-            
+            stmt = insert(self.request_mappings).on_conflict_do_nothing()
+        else:
+            stmt = self.request_mappings.insert()
+
         with self.engine.begin() as conn:
-            conn.execute(stmt)
+            conn.execute(stmt, mappings)
+
+    def insert_request_mapping(self, custom_id: str, problem_id: str):
+        self.insert_request_mappings_batch([{'custom_id': custom_id, 'problem_id': problem_id}])
 
     def get_problem_id_by_custom_id(self, custom_id: str) -> Optional[str]:
         query = select(self.request_mappings.c.problem_id).where(self.request_mappings.c.custom_id == custom_id)
         with self.engine.connect() as conn:
             return conn.execute(query).scalar()
 
+    def get_request_mappings(self) -> Dict[str, str]:
+        """Load the full custom_id -> problem_id mapping in one query."""
+        query = select(self.request_mappings.c.custom_id, self.request_mappings.c.problem_id)
+        with self.engine.connect() as conn:
+            return {row.custom_id: row.problem_id for row in conn.execute(query)}
+
     def insert_annotations_batch(self, annotations: List[Dict[str, Any]]):
         if not annotations:
             return
@@ -1,35 +1,85 @@
 import sqlite3
 import pandas as pd
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
+from joblib import Parallel, delayed
 import os
 
 DB_PATH = "problems.db"
 OUTPUT_FILE = "token_histograms.png"
+BINS = 30
+CHUNK_SIZE = 200_000
+DTYPES = {'model': 'category', 'difficulty': 'category', 'completion_tokens': 'int64'}
+
+FROM_CLAUSE = """
+        FROM responses r
+        JOIN problems p ON r.problem_id = p.id
+        WHERE r.completion_tokens IS NOT NULL
+        AND r.verification_status = 'passed'
+"""
+
+def count_chunk(chunk):
+    """Per-value counts, token sum and row count per (model, difficulty) cell of one chunk."""
+    partial = {}
+    for key, values in chunk.groupby(['model', 'difficulty'], observed=True)['completion_tokens']:
+        partial[key] = (values.value_counts(), int(values.sum()), len(values))
+    return partial
+
+def exact_median(value_counts):
+    """Median of integer token counts given how often each value occurs."""
+    value_counts = value_counts.sort_index()
+    cumulative = value_counts.cumsum().to_numpy()
+    values = value_counts.index.to_numpy()
+    n = cumulative[-1]
+    # The two middle order statistics (1-based); they coincide when n is odd
+    lower = values[np.searchsorted(cumulative, (n - 1) // 2 + 1)]
+    upper = values[np.searchsorted(cumulative, n // 2 + 1)]
+    return (lower + upper) / 2
 
 def main():
     print("Loading data...")
     conn = sqlite3.connect(DB_PATH)
     
-    query = """
+    query = f"""
         SELECT 
-            r.model,
-            p.difficulty,
+            COALESCE(r.model, 'Unknown') AS model,
+            COALESCE(p.difficulty, 'Unknown') AS difficulty,
             r.completion_tokens
-        FROM responses r
-        JOIN problems p ON r.problem_id = p.id
-        WHERE r.completion_tokens IS NOT NULL
-        AND r.verification_status = 'passed'
+        {FROM_CLAUSE}
     """
     
-    df = pd.read_sql_query(query, conn)
+    # Stream the rows; chunks are counted in parallel and only how often each token
+    # count occurs per cell is kept, which is all the histograms and KDEs need
+    reader = pd.read_sql_query(query, conn, chunksize=CHUNK_SIZE, dtype=DTYPES)
+    partials = Parallel(n_jobs=-1)(delayed(count_chunk)(chunk) for chunk in reader)
     conn.close()
     
-    print(f"Loaded {len(df)} records.")
+    totals = {}
+    for partial in partials:
+        for key, (value_counts, token_sum, n) in partial.items():
+            if key in totals:
+                acc_values, acc_sum, acc_n = totals[key]
+                totals[key] = (acc_values.add(value_counts, fill_value=0), acc_sum + token_sum, acc_n + n)
+            else:
+                totals[key] = (value_counts, token_sum, n)
+    
+    if not totals:
+        print("No records found.")
+        return
+    
+    stats = {
+        key: (value_counts.sort_index(), n, token_sum / n, exact_median(value_counts))
+        for key, (value_counts, token_sum, n) in totals.items()
+    }
+    
+    print(f"Loaded {sum(n for *_, n in totals.values())} records.")
     
     # Get unique models and difficulties
-    models = sorted(df['model'].unique())
-    difficulties = sorted(df['difficulty'].unique())
+    models = sorted({model for model, _ in stats})
+    difficulties = sorted({diff for _, diff in stats})
     
     n_models = len(models)
     n_diffs = len(difficulties)
@@ -55,14 +105,14 @@ def main():
         for j, diff in enumerate(difficulties):
             ax = axes[i][j]
             
-            subset = df[(df['model'] == model) & (df['difficulty'] == diff)]
-            data = subset['completion_tokens']
-            
-            if len(data) > 0:
-                mean_val = data.mean()
-                median_val = data.median()
+            if (model, diff) in stats:
+                value_counts, n, mean_val, median_val = stats[(model, diff)]
                 
-                sns.histplot(data, ax=ax, kde=True, bins=30)
+                # Each distinct value weighted by how often it occurs gives the same bins as
+                # the raw rows; the KDE bandwidth is Scott's factor for the row count, since
+                # the weighted default would use the (smaller) effective sample size
+                sns.histplot(x=value_counts.index.to_numpy(), weights=value_counts.to_numpy(), ax=ax,
+                             kde=True, bins=BINS, kde_kws={'bw_method': n ** -0.2})
                 ax.axvline(mean_val, color='r', linestyle='--', label=f'Mean: {mean_val:.1f}')
                 ax.axvline(median_val, color='g', linestyle='-', label=f'Median: {median_val:.1f}')
                 ax.legend()
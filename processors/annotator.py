@@ -11,6 +11,14 @@ from database import ReasoningDatabase
 
 logger = logging.getLogger(__name__)
 
+INTRA_REPETITION_RE = re.compile(r'((.{2,20}?)\2{20,})')
+CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+
+# Traces shorter than this (in characters) skip the paragraph/n-gram repetition scans.
+MIN_REPETITION_SCAN_CHARS = 1024
+# Texts smaller than this (in bytes) are not compressed; their ratio is reported as 1.0.
+MIN_COMPRESS_BYTES = 2048
+
 # --- Logic extracted from analyze_paragraphs.py ---
 
 def calculate_metrics(text):
@@ -25,10 +33,14 @@ def calculate_metrics(text):
     unique_lines = len(set(lines))
     lrr = total_lines / unique_lines if unique_lines > 0 else 0.0
     
-    original_size = len(text.encode('utf-8'))
+    encoded = text.encode('utf-8')
+    original_size = len(encoded)
     if original_size == 0:
         return 0.0, 1.0, 0
-    compressed_size = len(zlib.compress(text.encode('utf-8')))
+    if original_size < MIN_COMPRESS_BYTES:
+        # zlib setup cost dominates on small inputs and the ratio is meaningless there
+        return lrr, 1.0, total_lines
+    compressed_size = len(zlib.compress(encoded))
     cr = compressed_size / original_size
     
     return lrr, cr, total_lines
@@ -52,14 +64,11 @@ def check_heuristics(text, lines):
     return max_line_len, token_bad
 
 def check_language(text):
-    cjk_count = 0
     total_chars = len(text)
     if total_chars == 0:
         return False, []
     
-    for char in text:
-        if '\u4e00' <= char <= '\u9fff':
-            cjk_count += 1
+    cjk_count = len(CJK_RE.findall(text))
     
     reasons = []
     if cjk_count > 0:
@@ -88,28 +97,22 @@ def check_language(text):
              
     return len(reasons) > 0, reasons
 
+BACKTRACKING_KEYWORDS = tuple(kw.lower() for kw in [
+    "But wait", "Actually", "Hold on", "Let me re-read", "Let me check",
+    "correction", "mistake", "incorrect", "Wait,", "However, note that",
+    "On second thought", "Alternatively, we can", "Let's double check",
+    "re-evaluating", "My previous assumption"
+])
+UNCERTAINTY_KEYWORDS = tuple(kw.lower() for kw in [
+    "I am confused", "Is it possible", "not sure if", "might be invalid",
+    "Could it be that", "I don't understand", "What if", "unclear",
+    "ambiguous", "Do I need to", "assuming that"
+])
+
 def detect_reasoning_flaws(text):
-    backtracking_keywords = [
-        "But wait", "Actually", "Hold on", "Let me re-read", "Let me check",
-        "correction", "mistake", "incorrect", "Wait,", "However, note that",
-        "On second thought", "Alternatively, we can", "Let's double check",
-        "re-evaluating", "My previous assumption"
-    ]
-    uncertainty_keywords = [
-        "I am confused", "Is it possible", "not sure if", "might be invalid",
-        "Could it be that", "I don't understand", "What if", "unclear",
-        "ambiguous", "Do I need to", "assuming that"
-    ]
-    
-    backtracking_count = 0
-    uncertainty_count = 0
     text_lower = text.lower()
-    
-    for kw in backtracking_keywords:
-        backtracking_count += text_lower.count(kw.lower())
-    for kw in uncertainty_keywords:
-        uncertainty_count += text_lower.count(kw.lower())
-        
+    backtracking_count = sum(text_lower.count(kw) for kw in BACKTRACKING_KEYWORDS)
+    uncertainty_count = sum(text_lower.count(kw) for kw in UNCERTAINTY_KEYWORDS)
     return backtracking_count, uncertainty_count
 
 def get_max_consecutive_repetition(tokens, n):
@@ -151,11 +154,7 @@ def process_item_worker(item):
         lines_list = [l.strip() for l in reasoning_content.split('\n') if l.strip()]
         max_line_len, token_bad = check_heuristics(reasoning_content, lines_list)
         
-        is_safe_cjk = False
-        for char in problem_text:
-            if '\u4e00' <= char <= '\u9fff':
-                is_safe_cjk = True
-                break
+        is_safe_cjk = CJK_RE.search(problem_text) is not None
         
         lang_bad = False
         lang_reasons = []
@@ -169,7 +168,7 @@ def process_item_worker(item):
         intra_paragraph_repetition = False
         high_ngram_repetition = {}
         
-        if reasoning_content:
+        if len(reasoning_content) >= MIN_REPETITION_SCAN_CHARS:
             paragraphs = reasoning_content.split('\n\n')
             non_empty_paragraphs = [p for p in paragraphs if p.strip()]
             count = len(non_empty_paragraphs)
@@ -179,36 +178,36 @@ def process_item_worker(item):
                 
             prompt_content = problem_text
 
-            if count > 5:
-                repeats = 0
-                last_p = None
-                for p in non_empty_paragraphs:
+            # Single pass over the paragraphs: sequential duplicates and
+            # intra-paragraph repetition are detected in the same sweep.
+            repeats = 0
+            last_p = None
+            for p in non_empty_paragraphs:
+                if not sequential_paragraph_repeat:
                     if p == last_p:
                         repeats += 1
                     else:
                         repeats = 0
                     last_p = p
-                    if repeats >= 5:
-                        if prompt_content and p in prompt_content:
-                            continue
+                    if repeats >= 5 and not (prompt_content and p in prompt_content):
                         sequential_paragraph_repeat = True
-                        break
-            
-            for p in non_empty_paragraphs:
-                check_p = p
-                if len(check_p) > 5000:
-                    check_p = check_p[:2500] + check_p[-2500:]
-                
-                for match in re.finditer(r'((.{2,20}?)\2{20,})', check_p):
-                    repeated_unit = match.group(2)
-                    if not repeated_unit.strip() or set(repeated_unit) == {'-'}:
-                        continue
-                    if prompt_content and repeated_unit in prompt_content:
-                        continue
-                    if len(match.group(1)) / len(check_p) > 0.5:
-                        intra_paragraph_repetition = True
-                        break
-                if intra_paragraph_repetition:
+
+                if not intra_paragraph_repetition:
+                    check_p = p
+                    if len(check_p) > 5000:
+                        check_p = check_p[:2500] + check_p[-2500:]
+
+                    for match in INTRA_REPETITION_RE.finditer(check_p):
+                        repeated_unit = match.group(2)
+                        if not repeated_unit.strip() or set(repeated_unit) == {'-'}:
+                            continue
+                        if prompt_content and repeated_unit in prompt_content:
+                            continue
+                        if len(match.group(1)) / len(check_p) > 0.5:
+                            intra_paragraph_repetition = True
+                            break
+
+                if sequential_paragraph_repeat and intra_paragraph_repetition:
                     break
             
             ngrams = [4, 6, 8, 10]
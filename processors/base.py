@@ -1,4 +1,8 @@
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Optional
 from database import ReasoningDatabase
 
 class Processor(ABC):
@@ -11,3 +15,23 @@ class Processor(ABC):
         Abstract method to perform work on the database.
         """
         pass
+
+def parse_files_parallel(parse_file: Callable[[str], List[Any]], files: List[str],
+                         max_workers: Optional[int] = None) -> Iterator[List[Any]]:
+    """
+    Parse files in a process pool and yield each file's records as soon as it is done.
+
+    At most two files per worker are in flight, so parsed records never pile up
+    faster than the caller writes them. parse_file must be picklable.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    files = iter(files)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(parse_file, path) for path in islice(files, max_workers * 2)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = next(files, None)
+                if path is not None:
+                    pending.add(executor.submit(parse_file, path))
+                yield future.result()
@@ -1,14 +1,17 @@
-import json
 import os
+import orjson
 import multiprocessing
 from datetime import datetime
 from tqdm import tqdm
-from sqlalchemy import select, and_, cast, Text
+from sqlalchemy import select, and_, cast, bindparam, Text
 from database import ReasoningDatabase
 
 # Default number of workers
 NUM_WORKERS = min(4, max(1, os.cpu_count() - 1))
 
+# Number of response rows buffered before a Parquet row group is written
+PARQUET_CHUNK_SIZE = 10000
+
 def get_problem_text(content, source):
     """Extract problem description based on source."""
     if source == 'apps':
@@ -21,130 +24,189 @@ def get_problem_text(content, source):
         # codeforces, code_contests, and others usually use 'description'
         return content.get('description', '')
 
-def worker(db_url, input_queue, output_queue, filters):
+def worker(db_url, input_queue, output_queue, filters, parquet=False):
     """Worker process to fetch data and format it."""
     try:
         # Initialize database connection in worker
         db = ReasoningDatabase(db_url)
         
-        while True:
-            problem_id = input_queue.get()
-            if problem_id is None:
-                break
-            
-            try:
-                # Fetch problem details
-                # Cast JSON columns to Text to avoid SQLAlchemy auto-decoding errors on invalid JSON
-                query = select(
-                    db.problems.c.id,
-                    db.problems.c.source,
-                    db.problems.c.original_id,
-                    db.problems.c.difficulty,
-                    cast(db.problems.c.problem_content, Text).label('problem_content'),
-                    cast(db.problems.c.origin, Text).label('origin')
-                ).where(db.problems.c.id == problem_id)
-                
-                with db.engine.connect() as conn:
-                    prob_row = conn.execute(query).fetchone()
-                
-                if not prob_row:
-                    continue
-                
-                # Build response query with filters
-                conditions = [
-                    db.responses.c.problem_id == problem_id
-                ]
-                
-                if filters.get('status'):
-                    conditions.append(db.responses.c.verification_status == filters['status'])
-                
-                if filters.get('after'):
-                    conditions.append(db.responses.c.timestamp >= filters['after'])
-                if filters.get('before'):
-                    conditions.append(db.responses.c.timestamp <= filters['before'])
-                
-                resp_query = select(
-                    db.responses.c.id, 
-                    db.responses.c.model, 
-                    db.responses.c.full_response_text, 
-                    db.responses.c.reasoning_trace, 
-                    db.responses.c.completion_tokens,
-                    db.responses.c.timestamp
-                ).where(and_(*conditions))
-                
-                with db.engine.connect() as conn:
-                    resp_rows = conn.execute(resp_query).fetchall()
+        # Build both statements once per worker; only the bound problem_id changes per problem,
+        # so every execution reuses SQLAlchemy's cached compilation.
+        # Cast JSON columns to Text to avoid SQLAlchemy auto-decoding errors on invalid JSON
+        prob_query = select(
+            db.problems.c.id,
+            db.problems.c.source,
+            db.problems.c.original_id,
+            db.problems.c.difficulty,
+            cast(db.problems.c.problem_content, Text).label('problem_content'),
+            cast(db.problems.c.origin, Text).label('origin')
+        ).where(db.problems.c.id == bindparam('problem_id'))
+        
+        # Build response query with filters
+        conditions = [
+            db.responses.c.problem_id == bindparam('problem_id')
+        ]
+        
+        if filters.get('status'):
+            conditions.append(db.responses.c.verification_status == filters['status'])
+        
+        if filters.get('after'):
+            conditions.append(db.responses.c.timestamp >= filters['after'])
+        if filters.get('before'):
+            conditions.append(db.responses.c.timestamp <= filters['before'])
+        
+        resp_query = select(
+            db.responses.c.id, 
+            db.responses.c.model, 
+            db.responses.c.full_response_text, 
+            db.responses.c.reasoning_trace, 
+            db.responses.c.completion_tokens,
+            db.responses.c.timestamp
+        ).where(and_(*conditions))
+        
+        # One connection serves every problem this worker handles
+        with db.engine.connect() as conn:
+            while True:
+                problem_id = input_queue.get()
+                if problem_id is None:
+                    break
                 
-                if not resp_rows:
-                    continue
+                try:
+                    params = {'problem_id': problem_id}
+                    prob_row = conn.execute(prob_query, params).fetchone()
+                    
+                    if not prob_row:
+                        continue
+                    
+                    resp_rows = conn.execute(resp_query, params).fetchall()
+                    
+                    if not resp_rows:
+                        continue
 
-                # Parse problem content
-                problem_content = prob_row.problem_content
-                if isinstance(problem_content, str):
-                    try:
-                        problem_content = json.loads(problem_content)
-                    except:
+                    # Parse problem content
+                    problem_content = prob_row.problem_content
+                    if isinstance(problem_content, str):
+                        try:
+                            problem_content = orjson.loads(problem_content)
+                        except:
+                            problem_content = {}
+                    elif problem_content is None:
                         problem_content = {}
-                elif problem_content is None:
-                    problem_content = {}
                     
-                origin = prob_row.origin
-                if isinstance(origin, str):
-                    try:
-                        origin = json.loads(origin)
-                    except:
-                        pass 
+                    origin = prob_row.origin
+                    if isinstance(origin, str):
+                        try:
+                            origin = orjson.loads(origin)
+                        except:
+                            pass 
                 
-                problem_text = get_problem_text(problem_content, prob_row.source)
+                    problem_text = get_problem_text(problem_content, prob_row.source)
                 
-                # Format responses
-                responses_list = []
-                for r in resp_rows:
-                    responses_list.append({
-                        "role": "assistant",
-                        "content": r.full_response_text,
-                        "reasoning_content": r.reasoning_trace,
-                        "id": r.id,
-                        "model": r.model,
-                        "completion_tokens": r.completion_tokens,
-                        "timestamp": r.timestamp.isoformat() if r.timestamp else None
-                    })
+                    # Format responses
+                    responses_list = []
+                    for r in resp_rows:
+                        responses_list.append({
+                            "role": "assistant",
+                            "content": r.full_response_text,
+                            "reasoning_content": r.reasoning_trace,
+                            "id": r.id,
+                            "model": r.model,
+                            "completion_tokens": r.completion_tokens,
+                            "timestamp": r.timestamp  # orjson serializes datetimes natively
+                        })
                 
-                output_data = {
-                    "problem_id": problem_id,
-                    "problem": problem_text,
-                    "source": prob_row.source,
-                    "original_id": prob_row.original_id,
-                    "origin": origin,
-                    "difficulty": prob_row.difficulty,
-                    "responses": responses_list
-                }
+                    output_data = {
+                        "problem_id": problem_id,
+                        "problem": problem_text,
+                        "source": prob_row.source,
+                        "original_id": prob_row.original_id,
+                        "origin": origin,
+                        "difficulty": prob_row.difficulty,
+                        "responses": responses_list
+                    }
                 
-                output_queue.put(json.dumps(output_data))
+                    # The Parquet writer flattens records itself, so hand it the dict
+                    output_queue.put(output_data if parquet else orjson.dumps(output_data))
                 
-            except Exception as e:
-                print(f"Error processing problem {problem_id}: {e}")
+                except Exception as e:
+                    print(f"Error processing problem {problem_id}: {e}")
+                    # Clear any failed transaction so the shared connection stays usable
+                    conn.rollback()
                 
     except Exception as e:
         print(f"Worker initialization failed: {e}")
 
 def writer(output_queue, total_count, output_file):
     """Writer process to write results to file."""
-    with open(output_file, 'w') as f:
+    with open(output_file, 'wb') as f:
         pbar = tqdm(total=total_count, desc="Exporting")
         count = 0
         while count < total_count:
             line = output_queue.get()
-            f.write(line + "\n")
+            f.write(line + b"\n")
+            pbar.update(1)
+            count += 1
+        pbar.close()
+
+def parquet_writer(output_queue, total_count, output_file):
+    """Writer process to write results to a Parquet file, one row per response."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('problem_id', pa.string()),
+        ('problem', pa.large_string()),
+        ('source', pa.string()),
+        ('original_id', pa.string()),
+        ('origin', pa.string()),  # JSON-encoded, its shape varies by source
+        ('difficulty', pa.string()),
+        ('response_id', pa.string()),
+        ('model', pa.string()),
+        ('content', pa.large_string()),
+        ('reasoning_content', pa.large_string()),
+        ('completion_tokens', pa.int64()),
+        ('timestamp', pa.timestamp('us')),
+    ])
+
+    columns = {name: [] for name in schema.names}
+
+    def flush(pq_writer):
+        pq_writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+
+    with pq.ParquetWriter(output_file, schema, compression='snappy') as pq_writer:
+        pbar = tqdm(total=total_count, desc="Exporting")
+        count = 0
+        while count < total_count:
+            record = output_queue.get()
+            origin = orjson.dumps(record['origin']).decode() if record['origin'] is not None else None
+            for r in record['responses']:
+                columns['problem_id'].append(record['problem_id'])
+                columns['problem'].append(record['problem'])
+                columns['source'].append(record['source'])
+                columns['original_id'].append(record['original_id'])
+                columns['origin'].append(origin)
+                columns['difficulty'].append(record['difficulty'])
+                columns['response_id'].append(r['id'])
+                columns['model'].append(r['model'])
+                columns['content'].append(r['content'])
+                columns['reasoning_content'].append(r['reasoning_content'])
+                columns['completion_tokens'].append(r['completion_tokens'])
+                columns['timestamp'].append(r['timestamp'])
+            if len(columns['response_id']) >= PARQUET_CHUNK_SIZE:
+                flush(pq_writer)
             pbar.update(1)
             count += 1
+        if columns['response_id']:
+            flush(pq_writer)
         pbar.close()
 
 class ResponseExporter:
     def __init__(self, db):
         self.db = db
 
-    def process(self, output_file, after=None, before=None, difficulty=None, status='passed'):
+    def process(self, output_file, after=None, before=None, difficulty=None, status='passed', parquet=False):
         print("Fetching problem IDs...")
         
         # Build query to select problem IDs
@@ -199,12 +261,13 @@ class ResponseExporter:
         workers = []
         for _ in range(NUM_WORKERS):
             # Pass db_url explicitly to workers
-            p = multiprocessing.Process(target=worker, args=(self.db.db_url, input_queue, output_queue, worker_filters))
+            p = multiprocessing.Process(target=worker, args=(self.db.db_url, input_queue, output_queue, worker_filters, parquet))
             p.start()
             workers.append(p)
             
         # Start writer
-        writer_process = multiprocessing.Process(target=writer, args=(output_queue, total_problems, output_file))
+        writer_target = parquet_writer if parquet else writer
+        writer_process = multiprocessing.Process(target=writer_target, args=(output_queue, total_problems, output_file))
         writer_process.start()
         
         # Wait for workers
@@ -1,11 +1,51 @@
-import json
 import logging
+import msgspec
+import orjson
 from typing import List, Dict, Optional, Any
-from sqlalchemy import select, func
+from sqlalchemy import select, func, cast, Text
+from tqdm import tqdm
 from database import ReasoningDatabase
 
 logger = logging.getLogger(__name__)
 
+# Output buffer size; small partitions coalesce here, larger ones bypass it in one write
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Typed views of problem_content holding only the prompt fields; every other key
+# (notably large embedded test data) is skipped without being materialized.
+class _ProblemPrompt(msgspec.Struct):
+    problem: Optional[str] = None
+
+class _LcbPrompt(msgspec.Struct):
+    question_content: Optional[str] = None
+
+class _GenericPrompt(msgspec.Struct):
+    description: Optional[str] = None
+    prompt: Optional[str] = None
+    question: Optional[str] = None
+    problem: Optional[str] = None
+
+_PROBLEM_DECODER = msgspec.json.Decoder(_ProblemPrompt)
+_PROMPT_DECODERS = {
+    'apps': _PROBLEM_DECODER,
+    'taco': _PROBLEM_DECODER,
+    'code_generation_lite': msgspec.json.Decoder(_LcbPrompt),
+}
+_GENERIC_DECODER = msgspec.json.Decoder(_GenericPrompt)
+
+# Sampling parameters shared by every request body
+_BODY_TMPL = {
+    "temperature": 0.6,
+    "top_p": 0.95,
+    "thinking_budget": 32768,
+    "max_tokens": 32768
+}
+
+# The request envelope is identical on every line, so it is spliced in as pre-encoded bytes
+_REQUEST_PREFIX = b'{"custom_id":'
+_REQUEST_MIDDLE = b',"method":"POST","url":"/v1/chat/completions","body":'
+_REQUEST_SUFFIX = b'}\n'
+
 class PromptGenerator:
     def __init__(self, database: ReasoningDatabase):
         self.database = database
@@ -24,13 +64,23 @@ class PromptGenerator:
         
         try:
             # Build query
-            query = select(self.database.problems)
+            # Only the columns the prompt needs are fetched (test_cases can be very large);
+            # problem_content comes back as text so only the prompt field is decoded
+            problems = self.database.problems
+            query = select(problems.c.id, problems.c.source,
+                           cast(problems.c.problem_content, Text).label('problem_content'))
+            # Count total for progress bar; a separate count over ids only, since a
+            # window count would make the database buffer every matching row before
+            # returning the first one
+            count_query = select(func.count(problems.c.id))
             
             if difficulty:
                 query = query.where(self.database.problems.c.difficulty == difficulty)
+                count_query = count_query.where(problems.c.difficulty == difficulty)
             
             if source:
                 query = query.where(self.database.problems.c.source == source)
+                count_query = count_query.where(problems.c.source == source)
 
             query = query.order_by(self.database.problems.c.id)
 
@@ -40,39 +90,32 @@ class PromptGenerator:
             if offset > 0:
                 query = query.offset(offset)
 
-            # Count total for progress bar
-            count_query = select(func.count()).select_from(self.database.problems)
-            if difficulty:
-                count_query = count_query.where(self.database.problems.c.difficulty == difficulty)
-            if source:
-                count_query = count_query.where(self.database.problems.c.source == source)
-            
             with self.database.engine.connect() as conn:
-                total_count = conn.execute(count_query).scalar()
-            
+                total_count = max(0, conn.execute(count_query).scalar() - offset)
             if limit is not None:
                 total_count = min(total_count, limit)
-                if offset > 0:
-                    total_count = max(0, total_count - offset)
 
             count = 0
-            from tqdm import tqdm
             
-            with open(output_file, 'w') as f, tqdm(total=total_count, desc="Generating prompts") as pbar:
-                # Stream results
+            with open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as f, tqdm(total=total_count, desc="Generating prompts") as pbar:
+                # Stream results in partitions; each partition is formatted in memory
+                # and handed to the file as one contiguous block, i.e. a single write()
+                batch_size = 2000
                 with self.database.engine.connect() as conn:
-                    result = conn.execution_options(stream_results=True).execute(query)
+                    result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
                     
-                    for row in result:
-                        try:
-                            # row is a SQLAlchemy Row object, access by key works
-                            request_json = self._create_request(row._mapping, model)
-                            if request_json:
-                                f.write(json.dumps(request_json) + "\n")
-                                count += 1
-                                pbar.update(1)
-                        except Exception as e:
-                            logger.error(f"Error processing problem {row.id}: {e}")
+                    for batch in result.partitions():
+                        lines = []
+                        for problem_id, source, content in batch:
+                            try:
+                                request_line = self._create_request(problem_id, source, content, model)
+                                if request_line:
+                                    lines.append(request_line)
+                            except Exception as e:
+                                logger.error(f"Error processing problem {problem_id}: {e}")
+                        f.write(b"".join(lines))
+                        count += len(lines)
+                        pbar.update(len(lines))
 
             logger.info(f"Generated {count} prompts.")
 
@@ -80,47 +123,50 @@ class PromptGenerator:
             logger.error(f"Generation failed: {e}")
             raise
 
-    def _create_request(self, row: Dict[str, Any], model: str) -> Optional[Dict[str, Any]]:
-        """Creates the JSON request object for a single problem."""
-        problem_id = row['id']
-        source = row['source']
-        
-        # SQLAlchemy handles JSON deserialization automatically for JSON columns
-        content = row['problem_content']
-        # If it's still a string (e.g. SQLite sometimes), try to parse
-        if isinstance(content, str):
-            try:
-                content = json.loads(content)
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON in problem_content for {problem_id}")
-                return None
-        
-        if not content:
-             return None
+    def _create_request(self, problem_id: str, source: str, content: Any, model: str) -> Optional[bytes]:
+        """Creates the encoded JSONL request line for a single problem."""
+        if isinstance(content, (str, bytes)):
+            prompt_text = self._decode_prompt_text(problem_id, content, source)
+        else:
+            prompt_text = self._extract_prompt_text(content, source) if content else None
 
-        prompt_text = self._extract_prompt_text(content, source)
         if not prompt_text:
-            logger.warning(f"Could not extract prompt text for {problem_id}")
+            if prompt_text is not None:
+                logger.warning(f"Could not extract prompt text for {problem_id}")
             return None
 
-        return {
-            "custom_id": f"request-{problem_id}",
-            "method": "POST",
-            "url": "/v1/chat/completions",
-            "body": {
-                "model": model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt_text
-                    }
-                ],
-                "temperature": 0.6,
-                "top_p": 0.95,
-                "thinking_budget": 32768,
-                "max_tokens": 32768
-            }
+        body = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt_text}],
+            **_BODY_TMPL
         }
+        dumps = orjson.dumps
+        return (_REQUEST_PREFIX + dumps(f"request-{problem_id}") + _REQUEST_MIDDLE
+                + dumps(body) + _REQUEST_SUFFIX)
+
+    def _decode_prompt_text(self, problem_id: str, raw: Any, source: str) -> Optional[str]:
+        """Decodes only the prompt field from raw problem_content JSON; returns None if it is unusable."""
+        try:
+            prompt = _PROMPT_DECODERS.get(source, _GENERIC_DECODER).decode(raw)
+        except msgspec.ValidationError:
+            # Unexpected field types (or a non-object document): take the general path
+            try:
+                content = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                logger.warning(f"Invalid JSON in problem_content for {problem_id}")
+                return None
+            if not content:
+                return None
+            return self._extract_prompt_text(content, source)
+        except msgspec.DecodeError:
+            logger.warning(f"Invalid JSON in problem_content for {problem_id}")
+            return None
+
+        if isinstance(prompt, _GenericPrompt):
+            return prompt.description or prompt.prompt or prompt.question or prompt.problem or ''
+        if isinstance(prompt, _LcbPrompt):
+            return prompt.question_content or ''
+        return prompt.problem or ''
 
     def _extract_prompt_text(self, content: Dict[str, Any], source: str) -> str:
         """Extracts the problem description/prompt based on source."""
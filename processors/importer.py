@@ -1,13 +1,25 @@
 import time
 from datetime import datetime
-import json
+import msgspec
 import logging
 import glob
 import os
-from typing import List
+import re
+from typing import List, Optional
 from tqdm import tqdm
-from database import ReasoningDatabase
-from processors.base import Processor
+from database import ReasoningDatabase, RawJSON
+from processors.base import Processor, parse_files_parallel
+
+CODE_BLOCK_RE = re.compile(r'```[^\n]*\n(.*?)```', re.DOTALL)
+THINK_RE = re.compile(r'<think>(.*?)</think>', re.DOTALL)
+
+class ResponseLine(msgspec.Struct):
+    """The fields of a batch-output line that the importer reads; other keys are skipped undecoded."""
+    custom_id: Optional[str] = None
+    # Kept as the raw JSON slice so it can be stored without a decode/re-encode round trip
+    response: Optional[msgspec.Raw] = None
+
+RESPONSE_LINE_DECODER = msgspec.json.Decoder(ResponseLine)
 
 class ResponseImporter(Processor):
     def __init__(self, file_pattern: str):
@@ -15,42 +27,63 @@ class ResponseImporter(Processor):
         self.file_pattern = file_pattern
 
     def process(self, database: ReasoningDatabase):
-        files = glob.glob(self.file_pattern, recursive=True)
-        if not files:
-            logging.warning(f"No files found matching pattern: {self.file_pattern}")
-            return
-
-        logging.info(f"Found {len(files)} files to import.")
+        # Paths are yielded lazily, so parsing starts while the directory walk is still running
+        files = glob.iglob(self.file_pattern, recursive=True)
+        
+        # The mapping table is small and static during an import; load it once
+        # instead of issuing a lookup per response.
+        request_mappings = database.get_request_mappings()
+        logging.info(f"Loaded {len(request_mappings)} request mappings.")
         
+        # Files are parsed in worker processes; all database writes stay in this one
+        file_count = 0
         total_imported = 0
-        for file_path in tqdm(files, desc="Importing files"):
-            total_imported += self._import_file(database, file_path)
+        batch_size = 1000
+        for parsed in tqdm(parse_files_parallel(self._parse_file, files), desc="Importing files", unit="file"):
+            file_count += 1
+            records = []
+            for custom_id, record in parsed:
+                problem_id = request_mappings.get(custom_id)
+                if not problem_id:
+                    # Fallback: try to derive it
+                    if custom_id.startswith('request-'):
+                        problem_id = custom_id[len('request-'):]
+                    else:
+                        problem_id = custom_id
+                record["problem_id"] = problem_id
+                records.append(record)
             
+            for i in range(0, len(records), batch_size):
+                database.insert_responses_batch(records[i:i + batch_size])
+            total_imported += len(records)
+            
+        if not file_count:
+            logging.warning(f"No files found matching pattern: {self.file_pattern}")
+            return
+
+        logging.info(f"Imported {file_count} files.")
         logging.info(f"Import complete. Total records processed: {total_imported}")
 
-    def _import_file(self, database: ReasoningDatabase, file_path: str) -> int:
-        count = 0
-        batch_size = 1000
-        buffer = []
+    def _parse_file(self, file_path: str) -> List[tuple]:
+        """Parse one results file into (custom_id, record) pairs; problem_id is resolved by the caller."""
+        parsed = []
+        skipped = 0
         try:
-            with open(file_path, 'r') as f:
+            with open(file_path, 'rb') as f:
                 for line in f:
+                    # Blank lines are common at file ends; skip them without raising
+                    if not line.strip():
+                        continue
                     try:
-                        data = json.loads(line)
-                        custom_id = data.get('custom_id')
+                        data = RESPONSE_LINE_DECODER.decode(line)
+                        custom_id = data.custom_id
                         
                         if not custom_id:
                             continue
-                            
-                        problem_id = database.get_problem_id_by_custom_id(custom_id)
-                        if not problem_id:
-                            # Fallback: try to derive it
-                            if custom_id.startswith('request-'):
-                                problem_id = custom_id[len('request-'):]
-                            else:
-                                problem_id = custom_id
 
-                        response_obj = data.get('response', {})
+                        if data.response is None:
+                            continue
+                        response_obj = msgspec.json.decode(data.response)
                         if not response_obj or 'body' not in response_obj:
                             continue
                             
@@ -71,10 +104,10 @@ class ResponseImporter(Processor):
 
                         record = {
                             "id": response_id,
-                            "problem_id": problem_id,
+                            "problem_id": None,
                             "model": model,
                             "full_response_text": self._sanitize_string(full_response_text),
-                            "full_response_json": response_obj, # Pass object directly
+                            "full_response_json": RawJSON(bytes(data.response).decode('utf-8')),
                             "reasoning_trace": self._sanitize_string(reasoning_trace),
                             "extracted_code": self._sanitize_string(extracted_code),
                             "completion_tokens": completion_tokens,
@@ -83,22 +116,17 @@ class ResponseImporter(Processor):
                             "timestamp": datetime.fromtimestamp(created)
                         }
                         
-                        buffer.append(record)
-                        if len(buffer) >= batch_size:
-                            database.insert_responses_batch(buffer)
-                            count += len(buffer)
-                            buffer = []
+                        parsed.append((custom_id, record))
                         
-                    except json.JSONDecodeError:
-                        continue
+                    except msgspec.DecodeError:
+                        skipped += 1
         except Exception as e:
             logging.error(f"Error reading file {file_path}: {e}")
+
+        if skipped:
+            logging.warning(f"Skipped {skipped} malformed lines in {file_path}")
             
-        if buffer:
-            database.insert_responses_batch(buffer)
-            count += len(buffer)
-            
-        return count
+        return parsed
 
     
     def _sanitize_string(self, text):
@@ -107,18 +135,17 @@ class ResponseImporter(Processor):
         return text
 
     def _extract_code(self, text):
-        import re
-        matches = re.findall(r'```[^\n]*\n(.*?)```', text, re.DOTALL)
+        matches = CODE_BLOCK_RE.findall(text)
         if matches:
             return "\n\n".join(matches)
         return ""
 
     def _extract_reasoning(self, text, json_body=None):
-        import re
-        # Check for <think> tags
-        think_match = re.search(r'<think>(.*?)</think>', text, re.DOTALL)
-        if think_match:
-            return think_match.group(1).strip()
+        # Check for <think> tags (substring test first; most responses have none)
+        if '<think>' in text:
+            think_match = THINK_RE.search(text)
+            if think_match:
+                return think_match.group(1).strip()
         
         # Check for reasoning_content in json body
         if json_body and 'choices' in json_body and len(json_body['choices']) > 0:
@@ -1,10 +1,47 @@
 import json
 import logging
 import glob
+import mmap
 import os
+import re
+from typing import Dict, List
 from tqdm import tqdm
 from database import ReasoningDatabase
-from processors.base import Processor
+from processors.base import Processor, parse_files_parallel
+
+# A req-meta line whose record starts with custom_id and ends with the closing brace;
+# the value may contain JSON escapes. Such lines are read with this pattern alone, any
+# other line is decoded as JSON.
+CUSTOM_ID_LINE_RE = re.compile(
+    rb'^[ \t\r]*\{[ \t\r]*"custom_id"[ \t\r]*:[ \t\r]*"((?:[^"\\\n]|\\[^\n])*)"[ \t\r]*(?:,[^\n]*)?\}[ \t\r]*$',
+    re.M)
+
+def _add_mapping(mappings: List[Dict[str, str]], custom_id) -> None:
+    if not custom_id or not isinstance(custom_id, str):
+        return
+
+    # Fix: Strip 'request-' prefix to get the correct problem ID
+    if custom_id.startswith('request-'):
+        problem_id = custom_id[len('request-'):]
+    else:
+        problem_id = custom_id
+    
+    mappings.append({'custom_id': custom_id, 'problem_id': problem_id})
+
+def _parse_lines(lines: bytes, mappings: List[Dict[str, str]]) -> int:
+    """Decode each line as JSON, adding its custom_id mapping; returns the number of malformed lines."""
+    malformed = 0
+    for line in lines.splitlines():
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            malformed += 1
+            continue
+        if isinstance(data, dict):
+            _add_mapping(mappings, data.get('custom_id'))
+    return malformed
 
 class RequestMapper(Processor):
     def __init__(self, file_pattern: str):
@@ -12,43 +49,55 @@ class RequestMapper(Processor):
         self.file_pattern = file_pattern
 
     def process(self, database: ReasoningDatabase):
-        files = glob.glob(self.file_pattern, recursive=True)
-        if not files:
-            logging.warning(f"No files found matching pattern: {self.file_pattern}")
-            return
-
-        logging.info(f"Found {len(files)} req-meta files to process.")
+        # Paths are yielded lazily, so parsing starts while the directory walk is still running
+        files = glob.iglob(self.file_pattern, recursive=True)
         
+        # Files are parsed in worker processes; all database writes stay in this one
+        file_count = 0
         count = 0
-        for file_path in tqdm(files, desc="Mapping requests"):
-            count += self._process_file(database, file_path)
+        batch_size = 5000
+        for mappings in tqdm(parse_files_parallel(self._parse_file, files), desc="Mapping requests", unit="file"):
+            file_count += 1
+            for i in range(0, len(mappings), batch_size):
+                database.insert_request_mappings_batch(mappings[i:i + batch_size])
+            count += len(mappings)
             
+        if not file_count:
+            logging.warning(f"No files found matching pattern: {self.file_pattern}")
+            return
+
+        logging.info(f"Processed {file_count} req-meta files.")
         logging.info(f"Mapping complete. Total mappings processed: {count}")
 
-    def _process_file(self, database: ReasoningDatabase, file_path: str) -> int:
-        count = 0
+    def _parse_file(self, file_path: str) -> List[Dict[str, str]]:
+        mappings = []
         try:
-            with open(file_path, 'r') as f:
-                for line in f:
-                    try:
-                        data = json.loads(line)
-                        custom_id = data.get('custom_id')
-                        
-                        if not custom_id:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return mappings
+                # Only custom_id is needed, so lines are matched against a pattern in
+                # one pass instead of decoding each one as JSON; the lines in between
+                # matches are decoded, which also finds the malformed ones
+                malformed = 0
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    pos = 0
+                    for match in CUSTOM_ID_LINE_RE.finditer(content):
+                        if match.start() > pos + 1:
+                            malformed += _parse_lines(content[pos:match.start()], mappings)
+                        pos = match.end()
+                        raw = match.group(1)
+                        # Escaped IDs are rare; let the JSON decoder unescape them
+                        try:
+                            custom_id = json.loads(b'"' + raw + b'"') if b'\\' in raw else raw.decode('utf-8')
+                        except ValueError:
+                            malformed += 1
                             continue
-
-                        # Fix: Strip 'request-' prefix to get the correct problem ID
-                        if custom_id.startswith('request-'):
-                            problem_id = custom_id[len('request-'):]
-                        else:
-                            problem_id = custom_id
-                        
-                        database.insert_request_mapping(custom_id, problem_id)
-                        count += 1
-                        
-                    except json.JSONDecodeError:
-                        continue
+                        _add_mapping(mappings, custom_id)
+                    if len(content) > pos:
+                        malformed += _parse_lines(content[pos:], mappings)
+                if malformed:
+                    logging.warning(f"Skipped {malformed} malformed lines in {file_path}")
         except Exception as e:
             logging.error(f"Error reading file {file_path}: {e}")
             
-        return count
+        return mappings
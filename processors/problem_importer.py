@@ -5,9 +5,15 @@ import os
 import zlib
 import pickle
 import base64
+import io
 from tqdm import tqdm
-from database import ReasoningDatabase
-from processors.base import Processor
+from database import ReasoningDatabase, RawJSON
+from processors.base import Processor, parse_files_parallel
+
+class RestrictedUnpickler(pickle.Unpickler):
+    """Unpickler for LCB test-case payloads, which are pickled strings and never reference globals."""
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Global '{module}.{name}' is not allowed in test-case payloads")
 
 class ProblemImporter(Processor):
     def __init__(self, file_pattern: str):
@@ -15,34 +21,53 @@ class ProblemImporter(Processor):
         self.file_pattern = file_pattern
 
     def process(self, database: ReasoningDatabase):
-        files = glob.glob(self.file_pattern, recursive=True)
-        if not files:
-            logging.warning(f"No files found matching pattern: {self.file_pattern}")
-            return
-
-        logging.info(f"Found {len(files)} req-meta files to import.")
+        # Paths are yielded lazily, so parsing starts while the directory walk is still running
+        files = glob.iglob(self.file_pattern, recursive=True)
         
+        # Files are parsed in worker processes; all database writes stay in this one
+        file_count = 0
         total_imported = 0
-        for file_path in tqdm(files, desc="Importing problems"):
-            total_imported += self._import_file(database, file_path)
+        batch_size = 1000
+        for records in tqdm(parse_files_parallel(self._parse_file, files), desc="Importing problems", unit="file"):
+            file_count += 1
+            for i in range(0, len(records), batch_size):
+                database.insert_problems_batch(records[i:i + batch_size])
+            total_imported += len(records)
             
+        if not file_count:
+            logging.warning(f"No files found matching pattern: {self.file_pattern}")
+            return
+
+        logging.info(f"Imported {file_count} req-meta files.")
         logging.info(f"Import complete. Total problems processed: {total_imported}")
 
     def _decode_lcb_test_cases(self, encoded_str):
+        # Public tests are plain JSON, private tests are base64(zlib(pickle(json))).
+        # Base64 text never starts with '[' or '{', so the first character picks the path.
         try:
-            return json.loads(encoded_str)
-        except:
-            try:
-                return json.loads(pickle.loads(zlib.decompress(base64.b64decode(encoded_str.encode("utf-8")))))
-            except Exception as e:
-                logging.error(f"Failed to decode LCB test cases: {e}")
-                return []
+            if encoded_str.lstrip()[:1] in ('[', '{'):
+                return json.loads(encoded_str)
+            payload = zlib.decompress(base64.b64decode(encoded_str.encode("utf-8")))
+            return json.loads(RestrictedUnpickler(io.BytesIO(payload)).load())
+        except Exception as e:
+            logging.error(f"Failed to decode LCB test cases: {e}")
+            return []
+
+    def _split_test_pairs(self, tests):
+        """Split a list of {'input', 'output'} dicts into parallel input and output lists in one pass."""
+        inputs, outputs = zip(*((t.get('input', ''), t.get('output', '')) for t in tests))
+        return list(inputs), list(outputs)
 
-    def _import_file(self, database: ReasoningDatabase, file_path: str) -> int:
-        count = 0
+    def _parse_file(self, file_path: str) -> list:
+        records = []
+        skipped = 0
         try:
             with open(file_path, 'r') as f:
                 for line in f:
+                    # Blank lines are common at file ends; skip them without raising
+                    line = line.strip()
+                    if not line:
+                        continue
                     try:
                         data = json.loads(line)
                         custom_id = data.get('custom_id')
@@ -63,10 +88,7 @@ class ProblemImporter(Processor):
                         elif 'lcb' in file_path:
                             source = 'code_generation_lite'
                         
-                        if 'source' in data:
-                            origin = data['source']
-                        else:
-                            origin = source
+                        origin = data.get('source', source)
 
                         # Derive problem_id
                         if custom_id.startswith('request-'):
@@ -89,11 +111,10 @@ class ProblemImporter(Processor):
                         
                         if source == 'codeforces':
                             test_cases_raw = data.get('test_cases', [])
-                            if not test_cases_raw and 'official_tests' in data:
-                                official_tests = data['official_tests']
+                            if not test_cases_raw:
+                                official_tests = data.get('official_tests')
                                 if official_tests:
-                                    inputs = [t.get('input', '') for t in official_tests]
-                                    outputs = [t.get('output', '') for t in official_tests]
+                                    inputs, outputs = self._split_test_pairs(official_tests)
                                     test_cases_raw = {"inputs": inputs, "outputs": outputs}
                         
                         elif source == 'code_contests':
@@ -102,9 +123,10 @@ class ProblemImporter(Processor):
                             outputs = []
                             
                             for key in ['public_tests', 'private_tests', 'generated_tests']:
-                                if key in data and data[key]:
-                                    key_inputs = data[key].get('input', [])
-                                    key_outputs = data[key].get('output', [])
+                                tests = data.get(key)
+                                if tests:
+                                    key_inputs = tests.get('input', [])
+                                    key_outputs = tests.get('output', [])
                                     if key_inputs and key_outputs:
                                         inputs.extend(key_inputs)
                                         outputs.extend(key_outputs)
@@ -116,24 +138,26 @@ class ProblemImporter(Processor):
                             public_tests = []
                             private_tests = []
                             
-                            if 'public_test_cases' in data:
-                                public_tests = self._decode_lcb_test_cases(data['public_test_cases'])
+                            encoded = data.get('public_test_cases')
+                            if encoded:
+                                public_tests = self._decode_lcb_test_cases(encoded)
                                 
-                            if 'private_test_cases' in data:
-                                private_tests = self._decode_lcb_test_cases(data['private_test_cases'])
+                            encoded = data.get('private_test_cases')
+                            if encoded:
+                                private_tests = self._decode_lcb_test_cases(encoded)
                                 
                             all_tests = public_tests + private_tests
                             if all_tests:
-                                inputs = [t.get('input', '') for t in all_tests]
-                                outputs = [t.get('output', '') for t in all_tests]
+                                inputs, outputs = self._split_test_pairs(all_tests)
                                 test_cases_raw = {"inputs": inputs, "outputs": outputs}
                         
                         if not test_cases_raw:
                              test_cases_raw = data.get('test_cases', [])
 
-                        # Pass objects directly instead of json.dumps
+                        # Pass objects directly instead of json.dumps; the record itself is
+                        # already JSON text, so store the line verbatim
                         test_cases = test_cases_raw
-                        problem_content = data
+                        problem_content = RawJSON(line)
 
                         record = {
                             "id": problem_id,
@@ -144,12 +168,14 @@ class ProblemImporter(Processor):
                             "test_cases": test_cases
                         }
                         
-                        database.insert_problem(record)
-                        count += 1
+                        records.append(record)
                         
                     except json.JSONDecodeError:
-                        continue
+                        skipped += 1
         except Exception as e:
             logging.error(f"Error reading file {file_path}: {e}")
+
+        if skipped:
+            logging.warning(f"Skipped {skipped} malformed lines in {file_path}")
             
-        return count
+        return records
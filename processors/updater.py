@@ -1,13 +1,16 @@
 import logging
-import json
+import orjson
 import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, bindparam
 from database import ReasoningDatabase
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of IDs bound into a single IN (...) clause
+IN_CLAUSE_CHUNK_SIZE = 500
+
 class ResponseUpdater:
     def __init__(self, db: ReasoningDatabase):
         self.db = db
@@ -38,14 +41,21 @@ class ResponseUpdater:
                     for line in f:
                         line = line.strip()
                         if not line: continue
+                        # Plain-text IDs are taken as-is; only JSON-looking lines are parsed
+                        first = line[0]
+                        if first != '{' and first != '"':
+                            target_ids.append(line)
+                            continue
                         try:
-                            data = json.loads(line)
-                            if isinstance(data, dict) and 'id' in data:
-                                target_ids.append(data['id'])
-                            elif isinstance(data, str):
-                                target_ids.append(data)
-                        except:
+                            data = orjson.loads(line)
+                        except orjson.JSONDecodeError:
                             target_ids.append(line)
+                            continue
+                        if isinstance(data, dict):
+                            if 'id' in data:
+                                target_ids.append(data['id'])
+                        elif isinstance(data, str):
+                            target_ids.append(data)
             except Exception as e:
                 logger.error(f"Error reading input file: {e}")
                 return
@@ -68,9 +78,6 @@ class ResponseUpdater:
             
         conditions = []
         
-        if target_ids:
-            conditions.append(self.db.responses.c.id.in_(target_ids))
-            
         if after:
             conditions.append(self.db.responses.c.timestamp >= after)
         
@@ -102,8 +109,22 @@ class ResponseUpdater:
 
         # 3. Execute Selection
         logger.info("Querying candidates...")
+        candidates = []
         with self.db.engine.connect() as conn:
-            candidates = [row[0] for row in conn.execute(stmt)]
+            if input_file:
+                if not target_ids:
+                    logger.warning("No IDs found in input file; nothing to update.")
+                    return
+                # Deduplicate, then keep each IN (...) list small enough for SQLite's
+                # bound-parameter limit and cheap to plan
+                target_ids = list(dict.fromkeys(target_ids))
+                # Built once with an expanding parameter; every chunk reuses the cached compilation
+                chunk_stmt = stmt.where(self.db.responses.c.id.in_(bindparam('ids', expanding=True)))
+                for i in range(0, len(target_ids), IN_CLAUSE_CHUNK_SIZE):
+                    chunk = target_ids[i:i + IN_CLAUSE_CHUNK_SIZE]
+                    candidates.extend(row[0] for row in conn.execute(chunk_stmt, {'ids': chunk}))
+            else:
+                candidates = [row[0] for row in conn.execute(stmt)]
             
         logger.info(f"Found {len(candidates)} matching responses match criteria.")
         
@@ -113,24 +134,10 @@ class ResponseUpdater:
         # 4. Perform Update
         logger.info(f"Updating {len(candidates)} responses to status='{new_status}' (dryrun={dryrun})")
         
-        batch_size = 1000
-        total_updated = 0
-        
-        for i in range(0, len(candidates), batch_size):
-            batch_ids = candidates[i:i+batch_size]
+        if not dryrun:
+            # One UPDATE ... WHERE id IN (...) per batch, all inside a single transaction
+            self.db.update_responses_by_ids(candidates, verification_status=new_status)
             
-            updates = []
-            for rid in batch_ids:
-                updates.append({
-                    "id": rid,
-                    "verification_status": new_status,
-                    # Reset verified/verifier fields if needed? 
-                    # For now just status.
-                })
-            
-            if not dryrun:
-                self.db.update_responses_batch(updates)
-                
-            total_updated += len(updates)
+        total_updated = len(candidates)
             
         logger.info(f"Done. Updated {total_updated} responses.")
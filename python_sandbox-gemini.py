@@ -2,6 +2,16 @@ import os
 import tempfile
 import uuid
 import multiprocessing
+import multiprocessing.connection
+import multiprocessing.util
+import queue
+import signal
+import marshal
+import collections
+import hashlib
+import gc
+import threading
+import time
 import shutil
 import sys
 import io
@@ -9,30 +19,78 @@ import contextlib
 import resource
 import traceback
 
-def _sandbox_worker(code, stdin, sandbox_dir, return_dict, max_memory_bytes, cpu_limit_seconds):
+class _ExecutionTimeout(BaseException):
+    """Raised in the worker when its own timer expires. A BaseException, so a bare
+    `except Exception` in the executed code does not swallow it."""
+
+
+def _raise_timeout(signum, frame):
+    raise _ExecutionTimeout
+
+
+def _start_timer(seconds):
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+
+
+def _stop_timer():
+    signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _data_bytes():
+    """Return the size of this process's writable private memory (data and stack), or 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            fields = f.read().split()
+    except OSError:
+        return 0
+    return int(fields[5]) * resource.getpagesize()
+
+
+def _set_resource_limits(max_memory_bytes, cpu_limit_seconds):
+    """Let the kernel stop runaway code; limits the platform rejects are skipped."""
+    if cpu_limit_seconds:
+        # RLIMIT_CPU takes integer seconds
+        cpu_limit_int = int(cpu_limit_seconds) + 1
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit_int, cpu_limit_int))
+        except ValueError:
+            pass
+
+    if max_memory_bytes:
+        # RLIMIT_DATA counts the memory the code can write to. RLIMIT_AS is left
+        # alone: it also counts address space that is only reserved (a malloc arena
+        # per thread, library buffers), so a larger budget could make thread
+        # creation fail. The worker is forked and inherits the parent's memory,
+        # so the budget is granted on top of what is already in use.
+        data_limit = _data_bytes() + max_memory_bytes
+        try:
+            resource.setrlimit(resource.RLIMIT_DATA, (data_limit, data_limit))
+        except ValueError:
+            pass
+
+        # Oversized files fail with an OSError instead of SIGXFSZ killing the worker
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+        try:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (max_memory_bytes, max_memory_bytes))
+        except ValueError:
+            pass
+
+
+def _sandbox_worker(code, stdin, sandbox_dir, max_memory_bytes, cpu_limit_seconds, timeout, conn):
     """
     Worker function to execute code in a separate process.
     """
     try:
-        # Create sandbox directory
-        os.makedirs(sandbox_dir, exist_ok=True)
-        os.chdir(sandbox_dir)
+        # Create sandbox directory; code that does not need one runs from the temp dir
+        if sandbox_dir is not None:
+            os.makedirs(sandbox_dir, exist_ok=True)
+            os.chdir(sandbox_dir)
+        else:
+            os.chdir(tempfile.gettempdir())
 
         # Set resource limits
-        #  if max_memory_bytes:
-        #      try:
-        #          resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
-        #      except ValueError:
-        #          pass # Ignore if not allowed
-        #
-        #  if cpu_limit_seconds:
-        #      try:
-        #          # CPU time is in seconds
-        #          # RLIMIT_CPU takes integer seconds
-        #          cpu_limit_int = int(cpu_limit_seconds) + 1
-        #          resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit_int, cpu_limit_int))
-        #      except ValueError:
-        #          pass
+        _set_resource_limits(max_memory_bytes, cpu_limit_seconds)
 
         # Prepare stdin
         if stdin:
@@ -44,13 +102,24 @@ def _sandbox_worker(code, stdin, sandbox_dir, return_dict, max_memory_bytes, cpu
         stdout_capture = io.StringIO()
         stderr_capture = io.StringIO()
 
+        # The worker times itself out so the output so far can still be returned;
+        # the parent only kills it if that does not work
+        timed_out = False
         with contextlib.redirect_stdout(stdout_capture), contextlib.redirect_stderr(stderr_capture):
             try:
                 # Execute the code
                 # We use a fresh dictionary for globals/locals
                 exec_globals = {"__name__": "__main__"}
-                exec(code, exec_globals)
+                code = _load_job_code(code, conn)
+                _start_timer(timeout)
+                try:
+                    exec(code, exec_globals)
+                finally:
+                    _stop_timer()
                 success = True
+            except _ExecutionTimeout:
+                timed_out = True
+                success = False
             except SystemExit as e:
                 traceback.print_exc()
                 print(f"Sandbox attempted to exit: SystemExit({e.code})", file=sys.stderr)
@@ -58,46 +127,248 @@ def _sandbox_worker(code, stdin, sandbox_dir, return_dict, max_memory_bytes, cpu
                 traceback.print_exc()
                 success = False
 
-        return_dict['success'] = success
-        return_dict['stdout'] = stdout_capture.getvalue()
-        return_dict['stderr'] = stderr_capture.getvalue()
+        result = {
+            'success': success,
+            'stdout': stdout_capture.getvalue(),
+            'stderr': stderr_capture.getvalue() + ("Execution timed out" if timed_out else "")
+        }
 
     except Exception as e:
-        return_dict['success'] = False
-        return_dict['stdout'] = ""
-        return_dict['stderr'] = f"Sandbox internal error: {str(e)}"
+        result = {
+            'success': False,
+            'stdout': "",
+            'stderr': f"Sandbox internal error: {str(e)}"
+        }
+
+    # Send the whole result back to the parent as a single message
+    conn.send(result)
+    conn.close()
+
+# fork where available: the child starts from the parent's memory instead of
+# re-importing the main module as "spawn" does
+_MP = multiprocessing.get_context(
+    "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+)
+
+# Started, idle single-use workers. Each one runs exactly one job and exits, so
+# every execution still gets a fresh process; starting the next worker while the
+# current job runs takes process creation off the caller's critical path.
+# Workers belong to the process that started them; a forked child that calls
+# run_sandbox (e.g. a pool worker) starts with an empty queue of its own.
+_standby_workers = None
+_standby_owner = None
+_standby_lock = threading.Lock()
+
+
+def _standby_worker(conn, parent_conn):
+    # A forked child inherits the parent's end too; holding it would keep recv()
+    # from ever seeing EOF once the parent exits
+    parent_conn.close()
+    # Everything inherited from the parent is moved out of the collector's reach:
+    # otherwise each collection in the job walks (and so copies) the parent's objects
+    gc.freeze()
+    # Numeric libraries size their thread pools, and the buffers they keep per
+    # thread, to the machine; under the job's memory and CPU-time limits one thread
+    # each is enough. Only affects libraries the parent has not loaded already.
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+    try:
+        job = conn.recv()
+    except EOFError:
+        # Parent went away before handing over a job
+        return
+    if job is None:
+        return
+    _sandbox_worker(*job, conn)
+
+
+def _start_worker():
+    parent_conn, child_conn = _MP.Pipe()
+    proc = _MP.Process(target=_standby_worker, args=(child_conn, parent_conn))
+    proc.start()
+    # Closing our copy of the child's end lets recv() see EOF if it dies
+    child_conn.close()
+    return proc, parent_conn
+
+
+def _standby_queue():
+    global _standby_workers, _standby_owner
+    pid = os.getpid()
+    if _standby_owner != pid:
+        with _standby_lock:
+            if _standby_owner != pid:
+                _standby_workers = queue.SimpleQueue()
+                # Registered as a multiprocessing finalizer: those run at exit before
+                # multiprocessing joins its remaining children, which would block on
+                # idle workers. Registration happens per process, since a
+                # multiprocessing child starts with no finalizers.
+                multiprocessing.util.Finalize(None, _stop_standby_workers, exitpriority=10)
+                _standby_owner = pid
+    return _standby_workers
+
+
+def _take_worker():
+    try:
+        return _standby_queue().get_nowait()
+    except queue.Empty:
+        return _start_worker()
+
+
+# Longest source whose compiled form is cached. A stdio script runs once per test
+# case and is reused; drivers that embed test data or a per-run marker never repeat,
+# and caching them would only pin large strings in the parent.
+_CACHED_SOURCE_LIMIT = 64 * 1024
+_CACHED_CODE_COUNT = 64
+
+# Marshalled code objects sent back by workers, keyed by a hash of their source. The
+# untrusted source is only ever compiled in a worker, under its resource limits; the
+# parent just hands a cached code object to the next worker running the same source.
+_compiled_code = collections.OrderedDict()
+_compiled_code_lock = threading.Lock()
+
+
+def _source_key(code):
+    """Cache key for code, or None if it is not worth caching."""
+    if len(code) > _CACHED_SOURCE_LIMIT:
+        return None
+    return hashlib.sha256(code.encode("utf-8", "surrogatepass")).digest()
+
+
+def _cached_code(key):
+    with _compiled_code_lock:
+        blob = _compiled_code.get(key)
+        if blob is not None:
+            _compiled_code.move_to_end(key)
+        return blob
+
+
+def _store_code(key, blob):
+    with _compiled_code_lock:
+        _compiled_code[key] = blob
+        _compiled_code.move_to_end(key)
+        if len(_compiled_code) > _CACHED_CODE_COUNT:
+            _compiled_code.popitem(last=False)
+
+
+def _load_job_code(code, conn):
+    """
+    Turn the job's code into a code object in the worker, after its limits are set:
+    a cached code object is unmarshalled, source is compiled. The code object of a
+    cacheable source goes to the parent ahead of the result, before any of it runs.
+    """
+    if isinstance(code, bytes):
+        return marshal.loads(code)
+    compiled = compile(code, "<string>", "exec")
+    if len(code) <= _CACHED_SOURCE_LIMIT:
+        conn.send(marshal.dumps(compiled))
+    return compiled
+
+
+# Extra time the parent allows past `timeout` for the worker to report its own
+# timeout before it is killed
+_TIMEOUT_GRACE = 0.25
+
+
+def _exit_handle(proc):
+    # A pidfd becomes readable when the process itself exits; proc.sentinel is a
+    # pipe that stays open for as long as any forked descendant inherited it
+    try:
+        return os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        return proc.sentinel
+
+
+def _remove_sandbox_dir(path):
+    # Most runs leave the directory empty, and a single rmdir removes it;
+    # only a directory with files in it needs the full tree walk
+    try:
+        os.rmdir(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _stop_standby_workers():
+    # Dismiss idle workers so interpreter shutdown does not wait on them
+    while True:
+        try:
+            proc, conn = _standby_workers.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        conn.close()
+        proc.join()
+
 
 def run_sandbox(
     code: str,
     stdin: str = None,
     timeout: float = 2.0,
     max_memory_mb: int = 1024,
-    cpu_limit_seconds: float = 1.5
+    cpu_limit_seconds: float = 1.5,
+    needs_fs: bool = True
 ):
     """
     Execute untrusted Python code inside a hardened, isolated sandbox environment.
     ...
     """
-    sandbox_dir = os.path.join(tempfile.gettempdir(), f"sandbox_{uuid.uuid4()}")
+    # Code that never touches the filesystem gets no directory of its own
+    sandbox_dir = os.path.join(tempfile.gettempdir(), f"sandbox_{uuid.uuid4()}") if needs_fs else None
     max_memory_bytes = max_memory_mb * 1024 * 1024
 
-    manager = multiprocessing.Manager()
-    return_dict = manager.dict()
-
-    proc = multiprocessing.Process(
-        target=_sandbox_worker,
-        args=(code, stdin, sandbox_dir, return_dict,
-              max_memory_bytes, cpu_limit_seconds)
-    )
+    # The job and its result travel over the worker's pipe; no Manager server process
+    proc, parent_conn = _take_worker()
+    code_key = _source_key(code)
+    blob = _cached_code(code_key) if code_key is not None else None
+    parent_conn.send((code if blob is None else blob, stdin, sandbox_dir, max_memory_bytes, cpu_limit_seconds, timeout))
+    # Start the next call's worker while this job runs
+    _standby_queue().put(_start_worker())
 
-    proc.start()
-    proc.join(timeout)
+    # Receive before joining: a large result blocks the child in send() until read.
+    # Waiting on the worker's exit as well wakes us as soon as it dies, even if a
+    # process it left behind still holds its end of the pipe open.
+    exit_handle = _exit_handle(proc)
+    deadline = time.monotonic() + timeout + _TIMEOUT_GRACE
+    try:
+        while True:
+            ready = multiprocessing.connection.wait([parent_conn, exit_handle], max(0.0, deadline - time.monotonic()))
+            if parent_conn in ready or (ready and parent_conn.poll(0)):
+                result = parent_conn.recv()
+            elif ready:
+                raise EOFError
+            else:
+                result = None
+            if not isinstance(result, bytes):
+                break
+            # The worker compiled the source and sent its code object ahead of the result
+            if code_key is not None:
+                _store_code(code_key, result)
+    except EOFError:
+        result = {"success": False, "stdout": "", "stderr": "Sandbox process exited without a result"}
+    finally:
+        parent_conn.close()
+        if exit_handle is not proc.sentinel:
+            os.close(exit_handle)
 
-    if proc.is_alive():
+    if result is None:
         proc.kill()
-        shutil.rmtree(sandbox_dir, ignore_errors=True)
+        proc.join()
+        if sandbox_dir is not None:
+            _remove_sandbox_dir(sandbox_dir)
         return {"success": False, "stdout": "", "stderr": "Execution timed out"}
 
-    shutil.rmtree(sandbox_dir, ignore_errors=True)
-    return dict(return_dict)
+    # The worker can still be held up after reporting, e.g. by a non-daemon thread
+    # the code started; it gets what is left of the time budget to exit
+    proc.join(max(0.0, deadline - time.monotonic()))
+    if proc.exitcode is None:
+        proc.kill()
+        proc.join()
+        result = {"success": False, "stdout": "", "stderr": "Execution timed out"}
+    if sandbox_dir is not None:
+        _remove_sandbox_dir(sandbox_dir)
+    return result
 
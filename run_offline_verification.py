@@ -5,10 +5,31 @@ import sys
 import os
 import ast
 import re
+import mmap
+import base64
+import pickle
+import functools
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from tqdm import tqdm
 from python_sandbox import run_sandbox
 sys.set_int_max_str_digits(100000)
 
+# Limits for every sandbox run
+SANDBOX_TIMEOUT = 2.0
+SANDBOX_MEMORY_MB = 128
+# A batched run stops starting new cases after this many seconds, so it finishes
+# inside SANDBOX_TIMEOUT and the remaining cases get a run of their own
+BATCH_TIME_BUDGET = 1.0
+# Pickled test data per batched run; larger tasks are split over several batches so
+# the embedded data stays well inside SANDBOX_MEMORY_MB
+BATCH_DATA_LIMIT = 4 << 20
+# Result file buffer; lines reach the disk in blocks rather than one flush per task
+RESULT_BUFFER_SIZE = 1 << 16
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -45,6 +66,9 @@ def check_match(expected, actual):
     tokens_expected = str_expected.split()
     tokens_actual = str_actual.split()
 
+    if tokens_expected == tokens_actual:
+        return True
+
     if len(tokens_expected) != len(tokens_actual):
         return False
 
@@ -78,78 +102,88 @@ def normalize_stdio_output(output: str) -> str:
     normalized_lines = [line.strip() for line in lines]
     return '\n'.join(normalized_lines).strip()
 
+# A line that is a class or function definition, ignoring leading whitespace
+DEFINITION_LINE_PATTERN = re.compile(r'\s*(?:class |def )')
+
 def extract_function_output(stdout: str) -> str:
     """Extract the function's return value from sandbox stdout."""
     if not stdout:
         return ""
-    lines = [ln for ln in stdout.split('\n') if ln.strip()]
-    filtered = []
-    for line in lines:
-        stripped = line.lstrip()
-        if stripped.startswith('class ') or stripped.startswith('def '):
-            continue
-        filtered.append(line)
-    return filtered[-1].strip() if filtered else ""
+    # Step back line by line from the end; only the returned line is copied out
+    end = len(stdout)
+    while end >= 0:
+        start = stdout.rfind('\n', 0, end) + 1
+        if not DEFINITION_LINE_PATTERN.match(stdout, start, end):
+            line = stdout[start:end].strip()
+            if line:
+                return line
+        end = start - 1
+    return ""
 
-def inside_solution_class(code: str, fn_name: str) -> bool:
-    pattern = rf"class\s+Solution\s*:\s*(?:.|\n)*?def\s+{re.escape(fn_name)}\s*\("
-    return re.search(pattern, code) is not None
+# Modules that give a solution no way to reach the filesystem; builtins only re-exports
+# names every solution already has (the verifier's prelude star-imports it)
+PURE_MODULES = frozenset({
+    "abc", "array", "bisect", "builtins", "cmath", "collections", "copy", "dataclasses",
+    "datetime", "decimal", "enum", "fractions", "functools", "heapq", "io",
+    "itertools", "json", "math", "numbers", "operator", "queue", "random", "re",
+    "statistics", "string", "sys", "textwrap", "time", "types", "typing",
+    "unicodedata",
+})
+# Names that open files whichever module they come from
+FILESYSTEM_NAMES = frozenset({"open", "FileIO", "fdopen", "Path"})
 
-def process_task(task):
-    code = task['code']
-    test_cases = task['test_cases']
-    import_string = task.get('import_string', '')
-    
-    inputs = []
-    outputs = []
-    fn_name = None
-    
-    if isinstance(test_cases, dict):
-        fn_name = test_cases.get("fn_name")
-        if "inputs" in test_cases and "outputs" in test_cases:
-            inputs = test_cases["inputs"]
-            outputs = test_cases["outputs"]
-            
-            # Ensure inputs and outputs have the same length
-            min_len = min(len(inputs), len(outputs))
-            inputs = inputs[:min_len]
-            outputs = outputs[:min_len]
+def needs_filesystem(code: str) -> bool:
+    """
+    Conservatively decide whether code may touch the filesystem: any file-opening
+    name or any import outside PURE_MODULES counts. Code that does not parse
+    cannot run, so it needs nothing.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.partition('.')[0] not in PURE_MODULES for alias in node.names):
+                return True
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or (node.module or '').partition('.')[0] not in PURE_MODULES:
+                return True
+        elif isinstance(node, ast.Name):
+            if node.id in FILESYSTEM_NAMES:
+                return True
+        elif isinstance(node, ast.Attribute):
+            if node.attr in FILESYSTEM_NAMES:
+                return True
+    return False
 
-    if not inputs:
-        return {
-            "id": task['id'],
-            "verification_status": "error",
-            "verification_details": {"error": "No test cases found"}
-        }
+@functools.lru_cache(maxsize=1024)
+def solution_method_pattern(fn_name: str) -> re.Pattern:
+    """Compiled pattern for a Solution class defining fn_name; DOTALL instead of (?:.|\n)."""
+    return re.compile(rf"class\s+Solution\s*:.*?def\s+{re.escape(fn_name)}\s*\(", re.DOTALL)
 
-    results = []
-    all_passed = True
-    
-    for i, (inp, expected) in enumerate(zip(inputs, outputs)):
-        driver_code = ""
-        stdin_input = None
-        
-        if fn_name:
-            # Function-based
-            if isinstance(inp, list) and len(inp) == 1 and isinstance(inp[0], list):
-                if len(inp[0]) >= 2 and all(x == [] for x in inp[0][-2:]):
-                    inp = [x for x in inp[0] if x != []]
-                else:
-                    inp = inp[0]
-
-            try:
-                args_json = repr(inp)
-                expected_json = repr(expected)
-            except Exception as e:
-                results.append({"index": i, "passed": False, "error": f"Serialization error: {e}"})
-                all_passed = False
-                continue
+def inside_solution_class(code: str, fn_name: str) -> bool:
+    return solution_method_pattern(fn_name).search(code) is not None
+
+def function_case_args(inp):
+    """Unwrap the argument list of a function-based test case."""
+    if isinstance(inp, list) and len(inp) == 1 and isinstance(inp[0], list):
+        if len(inp[0]) >= 2 and all(x == [] for x in inp[0][-2:]):
+            return [x for x in inp[0] if x != []]
+        return inp[0]
+    return inp
+
+def encode_case_data(case: bytes) -> str:
+    """
+    Base64 text of a pickled test case for embedding in a driver. The driver
+    unpickles it, so large inputs are one string token to the compiler rather
+    than a literal to parse, and non-literal values such as inf survive.
+    """
+    return base64.b64encode(case).decode('ascii')
 
-            call_fn_name = fn_name
-            if inside_solution_class(code, fn_name):
-                call_fn_name = f"Solution().{fn_name}"
-                
-            driver_code = f"""
+def function_driver(code, import_string, call_fn_name, case_data):
+    """Driver that runs the solution against a single function-based test case."""
+    return f"""
 {import_string}
 import sys
 import json
@@ -159,9 +193,10 @@ sys.set_int_max_str_digits(100000)
 {code}
 
 # Test Driver
+from pickle import loads as _load_case
+from base64 import b64decode as _decode_case
 try:
-    args = {args_json}
-    expected = {expected_json}
+    args, expected = _load_case(_decode_case("{case_data}"))
     
     result = {call_fn_name}(*args)
     
@@ -178,73 +213,298 @@ except Exception as e:
     print(f"RUNTIME ERROR: {{e}}", file=sys.stderr)
     # sys.exit(1)
 """
+
+def function_batch_driver(code, import_string, call_fn_name, cases, marker):
+    """
+    Driver that runs the solution against many function-based test cases in one process.
+    A marker line on both stdout and stderr shows the solution loaded, and each
+    case's output is framed by marker lines too; the header matches function_driver
+    so module-level tracebacks are identical. Each case's data is its own constant
+    and is only decoded when that case runs.
+    """
+    cases_data = "".join(
+        f"    ({i}, \"{encode_case_data(case)}\"),\n" for i, case, _ in cases
+    )
+    return f"""
+{import_string}
+import sys
+import json
+sys.set_int_max_str_digits(100000)
+
+# Solution Code
+{code}
+
+print("{marker} loaded")
+print("{marker} loaded", file=sys.stderr)
+
+# Test Driver
+from pickle import loads as _load_case
+from base64 import b64decode as _decode_case
+from time import perf_counter as _case_clock
+_case_deadline = _case_clock() + {BATCH_TIME_BUDGET!r}
+_cases = (
+{cases_data})
+for case_index, case_data in _cases:
+    if _case_clock() > _case_deadline:
+        break
+    print("{marker} begin", case_index)
+    print("{marker} begin", case_index, file=sys.stderr)
+    try:
+        args, expected = _load_case(_decode_case(case_data))
+        result = {call_fn_name}(*args)
+        
+        if result == expected:
+            print("PASSED")
+        elif isinstance(expected, list) and len(expected) == 1 and expected[0] == result:
+            print("PASSED")
+        else:
+            print(f"FAILED")
+            print(f"FAILED: Expected {{expected}}, got {{result}}", file=sys.stderr)
+    except Exception as e:
+        print(f"RUNTIME ERROR")
+        print(f"RUNTIME ERROR: {{e}}", file=sys.stderr)
+    print("{marker} end", case_index)
+    print("{marker} end", case_index, file=sys.stderr)
+"""
+
+def split_batch_output(result, marker, indices):
+    """
+    Split a batch run into per-case sandbox results, as if each case had run on
+    its own. Cases the run did not finish are left out.
+    """
+    streams = (result['stdout'], result['stderr'])
+    # Output produced while the solution loaded (module level) belongs to every case
+    loaded = f"{marker} loaded\n"
+    prefixes = []
+    positions = []
+    for text in streams:
+        end = text.find(loaded)
+        if end == -1:
+            return {}
+        prefixes.append(text[:end])
+        positions.append(end + len(loaded))
+
+    case_results = {}
+    for i in indices:
+        parts = []
+        for s, text in enumerate(streams):
+            begin = f"{marker} begin {i}\n"
+            start = text.find(begin, positions[s])
+            if start == -1:
+                break
+            start += len(begin)
+            end = text.find(f"{marker} end {i}\n", start)
+            if end == -1:
+                break
+            parts.append(prefixes[s] + text[start:end])
+            positions[s] = end
+        if len(parts) != 2:
+            break
+        case_results[i] = {"success": True, "stdout": parts[0], "stderr": parts[1]}
+    return case_results
+
+@functools.lru_cache(maxsize=256)
+def expected_stdio_text(expected: str) -> str:
+    """Normalize a string expectation; one holding a list literal means one item per line."""
+    # Only bracketed text can be a list literal, so nothing else is handed to the parser
+    stripped = expected.strip()
+    if stripped[:1] == '[' and stripped[-1:] == ']':
+        try:
+            parsed = ast.literal_eval(expected)
+            if isinstance(parsed, list):
+                expected = "\n".join(str(x) for x in parsed)
+        except:
+            pass
+    return normalize_stdio_output(expected)
+
+def expected_stdio_output(expected) -> str:
+    """Normalize a stdio case's expected output; string forms are cached, as cases often repeat them."""
+    if isinstance(expected, str):
+        return expected_stdio_text(expected)
+    return normalize_stdio_output(str(expected))
+
+def evaluate_case(i, expected, result, fn_name, expected_stdout=None):
+    """
+    Build the verification record for one test case from its sandbox result.
+    expected_stdout is the stdio expectation already passed through expected_stdio_output.
+    """
+    passed = False
+    error_msg = ""
+    actual_stdout = ""
+    
+    if result['success']:
+        actual_stdout = result['stdout']
+        
+        if fn_name:
+            actual_result = extract_function_output(actual_stdout)
+            if check_match(expected, actual_result) or "PASSED" in actual_stdout:
+                passed = True
+            else:
+                passed = False
+                error_msg = f"Expected: {str(expected)[:100]}..., Got: {actual_result[:100]}..."
         else:
-            # Stdio-based
+            if expected_stdout is None:
+                expected_stdout = expected_stdio_output(expected)
+            actual_stdout_normalized = normalize_stdio_output(actual_stdout)
+            
+            if check_match(expected_stdout, actual_stdout_normalized):
+                passed = True
+            else:
+                passed = False
+                error_msg = f"Expected: {expected_stdout[:100]}..., Got: {actual_stdout_normalized[:100]}..."
+    else:
+        passed = False
+        error_msg = f"Runtime Error: {result['stderr'][:200]}"
+
+    return {
+        "index": i,
+        "passed": passed,
+        "expected": str(expected)[:100],
+        "actual": actual_stdout[:100],
+        "error": error_msg,
+        "stderr": result['stderr'][:2000]
+    }
+
+def case_batches(cases):
+    """Group cases into consecutive batches holding at most BATCH_DATA_LIMIT bytes of test data."""
+    batch, size = [], 0
+    for case in cases:
+        if batch and size + len(case[1]) > BATCH_DATA_LIMIT:
+            yield batch
+            batch, size = [], 0
+        batch.append(case)
+        size += len(case[1])
+    if batch:
+        yield batch
+
+def run_function_cases(code, import_string, fn_name, inputs, outputs, needs_fs=True):
+    """
+    Run all function-based test cases, batched into as few sandbox processes as
+    BATCH_DATA_LIMIT allows. Cases a batch did not finish, and failed ones (which
+    may only have failed because of state left behind by earlier cases), are
+    re-run on their own.
+    """
+    results = []
+    cases = []
+    for i, (inp, expected) in enumerate(zip(inputs, outputs)):
+        inp = function_case_args(inp)
+        try:
+            case = pickle.dumps((inp, expected), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            results.append({"index": i, "passed": False, "error": f"Serialization error: {e}"})
+            continue
+        cases.append((i, case, expected))
+
+    call_fn_name = fn_name
+    if inside_solution_class(code, fn_name):
+        call_fn_name = f"Solution().{fn_name}"
+
+    if not cases:
+        return results
+
+    shared = None
+    for batch_cases in case_batches(cases):
+        case_results = {}
+        if shared is None:
+            marker = f"@@case-{os.urandom(8).hex()}@@"
+            batch = run_sandbox(
+                code=function_batch_driver(code, import_string, call_fn_name, batch_cases, marker),
+                timeout=SANDBOX_TIMEOUT,
+                max_memory_mb=SANDBOX_MEMORY_MB,
+                needs_fs=needs_fs
+            )
+            case_results = split_batch_output(batch, marker, [case[0] for case in batch_cases])
+            # The solution itself raised while loading; a separate run per case would fail
+            # in exactly the same way, so the batch result stands for all remaining cases.
+            # A failure after the solution loaded may come from the batch driver, so those
+            # cases rerun.
+            if (not batch['success'] and f"{marker} loaded" not in batch['stdout']
+                    and "Traceback (most recent call last):" in batch['stderr']):
+                shared = batch
+
+        for i, case, expected in batch_cases:
+            result = shared or case_results.get(i)
+            if result is not None:
+                record = evaluate_case(i, expected, result, fn_name)
+                if record["passed"] or shared:
+                    results.append(record)
+                    continue
+            result = run_sandbox(
+                code=function_driver(code, import_string, call_fn_name, encode_case_data(case)),
+                timeout=SANDBOX_TIMEOUT,
+                max_memory_mb=SANDBOX_MEMORY_MB,
+                needs_fs=needs_fs
+            )
+            results.append(evaluate_case(i, expected, result, fn_name))
+
+    results.sort(key=lambda r: r["index"])
+    return results
+
+def run_stdio_case(driver_code, stdin_input, needs_fs):
+    """Run the solution against one stdio test case (picklable, for the case pool)."""
+    return run_sandbox(
+        code=driver_code,
+        stdin=stdin_input,
+        timeout=SANDBOX_TIMEOUT,
+        max_memory_mb=SANDBOX_MEMORY_MB,
+        needs_fs=needs_fs
+    )
+
+def process_task(task, executor=None):
+    code = task['code']
+    test_cases = task['test_cases']
+    import_string = task.get('import_string', '')
+    
+    inputs = []
+    outputs = []
+    fn_name = None
+    
+    if isinstance(test_cases, dict):
+        fn_name = test_cases.get("fn_name")
+        if "inputs" in test_cases and "outputs" in test_cases:
+            inputs = test_cases["inputs"]
+            outputs = test_cases["outputs"]
+            
+            # Ensure inputs and outputs have the same length
+            min_len = min(len(inputs), len(outputs))
+            inputs = inputs[:min_len]
+            outputs = outputs[:min_len]
+
+    if not inputs:
+        return {
+            "id": task['id'],
+            "verification_status": "error",
+            "verification_details": {"error": "No test cases found"}
+        }
+
+    # Only solutions that may use files get a sandbox directory of their own
+    needs_fs = needs_filesystem(import_string + "\n" + code)
+
+    if fn_name:
+        # Function-based
+        results = run_function_cases(code, import_string, fn_name, inputs, outputs, needs_fs)
+    else:
+        # Stdio-based: every case needs its own stdin, so each gets its own run
+        driver_code = import_string + "\nsys.set_int_max_str_digits(100000)\n" + "\n" + code
+        stdin_inputs = []
+        for inp in inputs:
             if not isinstance(inp, str):
                 if isinstance(inp, list):
                     inp = "\n".join(inp)
                 else:
                     inp = str(inp)
-            
-            stdin_input = inp
-            driver_code = import_string + "\nsys.set_int_max_str_digits(100000)\n" + "\n" + code
-
-        # Run sandbox
-        result = run_sandbox(
-            code=driver_code,
-            stdin=stdin_input,
-            timeout=2.0,
-            max_memory_mb=128
-        )
-        
-        passed = False
-        error_msg = ""
-        actual_stdout = ""
-        
-        if result['success']:
-            actual_stdout = result['stdout']
-            
-            if fn_name:
-                actual_result = extract_function_output(actual_stdout)
-                if check_match(expected, actual_result) or "PASSED" in actual_stdout:
-                    passed = True
-                else:
-                    passed = False
-                    error_msg = f"Expected: {str(expected)[:100]}..., Got: {actual_result[:100]}..."
-            else:
-                raw_expected = expected
-                if isinstance(raw_expected, str) and raw_expected.strip().startswith('[') and raw_expected.strip().endswith(']'):
-                    try:
-                        parsed = ast.literal_eval(raw_expected)
-                        if isinstance(parsed, list):
-                            raw_expected = "\n".join(str(x) for x in parsed)
-                    except:
-                        pass
-                
-                expected_stdout = normalize_stdio_output(str(raw_expected))
-                actual_stdout_normalized = normalize_stdio_output(actual_stdout)
-                
-                if check_match(expected_stdout, actual_stdout_normalized):
-                    passed = True
-                else:
-                    passed = False
-                    error_msg = f"Expected: {expected_stdout[:100]}..., Got: {actual_stdout_normalized[:100]}..."
-        else:
-            passed = False
-            error_msg = f"Runtime Error: {result['stderr'][:200]}"
+            stdin_inputs.append(inp)
 
-        if not passed:
-            all_passed = False
-            
-        results.append({
-            "index": i,
-            "passed": passed,
-            "expected": str(expected)[:100],
-            "actual": actual_stdout[:100],
-            "error": error_msg,
-            "stderr": result['stderr'][:2000]
-        })
+        # Cases are independent, so with a pool they all run at once
+        run = executor.map if executor is not None and len(stdin_inputs) > 1 else map
+        sandbox_results = run(run_stdio_case, repeat(driver_code), stdin_inputs, repeat(needs_fs))
+        # Expected outputs are prepared up front; with a pool this overlaps the running cases
+        expected_stdouts = [expected_stdio_output(expected) for expected in outputs]
+        results = [evaluate_case(i, expected, result, fn_name, expected_stdout)
+                   for i, (expected, expected_stdout, result)
+                   in enumerate(zip(outputs, expected_stdouts, sandbox_results))]
 
+    all_passed = all(r["passed"] for r in results)
     status = "passed" if all_passed else "failed"
     return {
         "id": task['id'],
@@ -252,12 +512,60 @@ except Exception as e:
         "verification_details": results
     }
 
+def count_lines(path: str) -> int:
+    """Count lines as iterating over the file would, scanning 1 MiB blocks."""
+    count = 0
+    last = b"\n"
+    with open(path, 'rb') as f:
+        while block := f.read(1 << 20):
+            count += block.count(b"\n")
+            last = block[-1:]
+    return count + (last != b"\n")
+
+def iter_rank_lines(path: str, rank: int, world_size: int):
+    """
+    Yield (line number, raw line) for the lines belonging to this rank. Other
+    ranks' lines are only stepped over in the mapped file, never copied or decoded.
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            start = 0
+            i = 0
+            while start < size:
+                end = mm.find(b"\n", start)
+                if end == -1:
+                    end = size
+                if i % world_size == rank:
+                    yield i, mm[start:end]
+                start = end + 1
+                i += 1
+
+def write_results(f_out, lines: queue.Queue, errors: list):
+    """
+    Write serialized result lines to f_out until a None sentinel arrives. A write
+    error is kept in errors for the main thread to raise; later lines are drained
+    and dropped so the queue never fills up.
+    """
+    while (line := lines.get()) is not None:
+        if errors:
+            continue
+        try:
+            f_out.write(line)
+        except Exception as e:
+            errors.append(e)
+
 def main():
     parser = argparse.ArgumentParser(description="Run offline verification tasks")
     parser.add_argument("--tasks", required=True, help="Path to tasks JSONL file")
     parser.add_argument("--rank", type=int, default=0, help="Worker rank (0-indexed)")
     parser.add_argument("--world-size", type=int, default=1, help="Total number of workers")
     parser.add_argument("--total-lines", type=int, default=None, help="Total number of lines")
+    parser.add_argument("--case-workers", type=int, default=None,
+                        help="Processes running a task's stdio test cases in parallel "
+                             "(default: CPU count divided by world size; 1 runs them serially)")
     args = parser.parse_args()
 
     if args.rank < 0 or args.rank >= args.world_size:
@@ -273,33 +581,55 @@ def main():
         total_lines = 0
         if os.path.exists(args.tasks):
             # Quick line count
-            with open(args.tasks, 'rb') as f:
-                for _ in tqdm(f, desc="Count lines"):
-                    total_lines += 1
+            total_lines = count_lines(args.tasks)
     
     estimated_my_tasks = total_lines // args.world_size
     logging.info(f"Worker {args.rank}/{args.world_size} starting. Total tasks: {total_lines}. Estimated my tasks: {estimated_my_tasks}")
+
+    # Pool for running a task's stdio cases side by side; fork keeps worker startup cheap
+    case_workers = args.case_workers or max(1, (os.cpu_count() or 1) // args.world_size)
+    executor = None
+    if case_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=case_workers,
+                                       mp_context=multiprocessing.get_context("fork"))
     
-    with open(args.tasks, 'r') as f_in, open(output_file, 'w') as f_out:
+    with open(output_file, 'w', buffering=RESULT_BUFFER_SIZE) as f_out:
+        # Results are written by a background thread so the next task starts right away
+        results = queue.Queue(maxsize=1024)
+        write_errors = []
+        writer = threading.Thread(target=write_results, args=(f_out, results, write_errors), daemon=True)
+        writer.start()
+
         # Create progress bar
         pbar = tqdm(total=estimated_my_tasks, desc=f"Worker {args.rank}")
         
-        for i, line in enumerate(f_in):
-            # Check if this task belongs to this worker
-            if i % args.world_size == args.rank:
+        try:
+            # Only the lines belonging to this worker are read out and parsed
+            # (stdlib json keeps big integers in test data exact)
+            for i, line in iter_rank_lines(args.tasks, args.rank, args.world_size):
+                if write_errors:
+                    # Nothing more can be written; stop and raise below
+                    break
                 try:
                     task = json.loads(line)
-                    result = process_task(task)
-                    f_out.write(json.dumps(result) + "\n")
-                    f_out.flush()
+                    result = process_task(task, executor)
+                    results.put(json.dumps(result) + "\n")
                     pbar.update(1)
                 except json.JSONDecodeError:
                     continue
                 except Exception as e:
                     logging.error(f"Error processing line {i}: {e}")
+        finally:
+            results.put(None)
+            writer.join()
+        if write_errors:
+            raise write_errors[0]
         
         pbar.close()
 
+    if executor is not None:
+        executor.shutdown()
+
     logging.info(f"Worker {args.rank} finished. Results written to {output_file}")
 
 if __name__ == "__main__":
@@ -60,6 +60,7 @@ def main():
     verify_parser.add_argument("--dump-tasks", help="Path to output JSONL file for offline verification tasks")
     verify_parser.add_argument("--ingest-results", nargs="*", help="Path to input JSONL file with verification results")
     verify_parser.add_argument("--failure-log", help="Path to log file for verification failures")
+    verify_parser.add_argument("--no-fail-fast", action="store_true", help="Keep running remaining test cases after a response fails one (full per-test details)")
     
     # Import subparser
     import_parser = subparsers.add_parser("import", help="Import responses")
@@ -109,6 +110,7 @@ def main():
     export_parser.add_argument("--before", type=parse_datetime, help="Filter responses before this timestamp (ISO format or YYYY-MM-DD)")
     export_parser.add_argument("--difficulty", help="Filter by difficulty (comma-separated)")
     export_parser.add_argument("--status", default="passed", help="Filter by verification status (default: passed)")
+    export_parser.add_argument("--parquet", action="store_true", help="Write a Parquet file (one row per response) instead of JSONL")
 
     args = parser.parse_args()
     
@@ -120,7 +122,7 @@ def main():
     db = ReasoningDatabase(args.db)
     
     if args.command == "verify":
-        verifier = ResponseVerifier(args.endpoint, concurrency=args.concurrency)
+        verifier = ResponseVerifier(args.endpoint, concurrency=args.concurrency, fail_fast=not args.no_fail_fast)
         
         if args.dump_tasks:
             # Parse retry statuses
@@ -205,7 +207,8 @@ def main():
             after=args.after,
             before=args.before,
             difficulty=args.difficulty,
-            status=args.status
+            status=args.status,
+            parquet=args.parquet
         )
 
     